@@ -0,0 +1,18 @@
+# _njit.py
+#
+# Optional numba shim shared by the compiled kernels (features.py, universe.py).
+# Without numba, @njit / @njit(...) return the plain Python function and HAVE_NUMBA is False,
+# so callers can skip compiled paths that are only worth it when actually compiled.
+
+from __future__ import annotations
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # optional dependency: fall back to plain Python/NumPy
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda f: f
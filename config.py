@@ -10,7 +10,11 @@
 #
 # Adjust values here to change model behavior globally.
 
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+from typing import Set, Tuple
+
+# Field signatures of configs that already passed validate() (skip re-checking identical configs)
+_VALIDATED: Set[Tuple] = set()
 
 
 @dataclass
@@ -80,6 +84,10 @@ class ModelConfig:
     # Validation
     # ------------------------------------------------------------------
     def validate(self) -> None:
+        key = tuple(sorted(asdict(self).items()))
+        if key in _VALIDATED:
+            return
+
         total_weight = (
             self.weight_equity
             + self.weight_fx
@@ -99,3 +107,5 @@ class ModelConfig:
         if self.mom_12m_days <= self.mom_3m_days:
             raise ValueError("mom_12m_days must be > mom_3m_days.")
 
+        _VALIDATED.add(key)
+
@@ -11,7 +11,13 @@
 
 from __future__ import annotations
 
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
 from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
 
@@ -30,80 +36,98 @@ class FXProvider:
 
 
 # --------------------------------------------------------------------------------------
-# Helpers
+# yfinance (lazy)
 # --------------------------------------------------------------------------------------
 
-def _extract_close_as_series(data: pd.DataFrame, ticker: str) -> Optional[pd.Series]:
+# yfinance is imported on first download (not at module import / provider construction)
+_yf = None
+
+
+def _get_yf():
+    global _yf
+    if _yf is None:
+        import yfinance as yf
+        _yf = yf
+    return _yf
+
+
+# --------------------------------------------------------------------------------------
+# Shared download helper (bulk close block)
+# --------------------------------------------------------------------------------------
+
+# yf.download keeps its results in module-global state (shared._DFS), reset on every call,
+# so overlapping calls from different threads can drop or wait on each other's tickers.
+# One download at a time; yfinance still threads per ticker inside each call.
+_YF_DOWNLOAD_LOCK = threading.Lock()
+
+
+def _download_close_block(tickers: List[str], start: str) -> pd.DataFrame:
     """
-    Normalize yfinance output so Close is always returned as a Series.
-    Handles Series, 1-col DataFrame, or multi-col DataFrame cases.
+    One multi-symbol Yahoo request -> Close block (columns = upper-cased tickers).
+    Returns an empty DataFrame if Yahoo returns nothing usable.
     """
+    with _YF_DOWNLOAD_LOCK:
+        data = _get_yf().download(
+            tickers=list(tickers),
+            start=start,
+            auto_adjust=True,
+            progress=False,
+            group_by="column",
+            threads=True,
+        )
+
     if not isinstance(data, pd.DataFrame) or data.empty:
-        return None
-    if "Close" not in data.columns:
-        return None
+        return pd.DataFrame()
 
-    close = data["Close"]
+    try:
+        close = data["Close"]
+    except Exception:
+        return pd.DataFrame()
 
     if isinstance(close, pd.Series):
-        return close
+        close = close.to_frame(name=tickers[0])
 
-    if isinstance(close, pd.DataFrame):
-        # Single column
-        if close.shape[1] == 1:
-            return close.iloc[:, 0]
-        # If ticker present
-        if ticker in close.columns:
-            s = close[ticker]
-            if isinstance(s, pd.Series):
-                return s
-        # Fallback: first column
-        return close.iloc[:, 0]
-
-    return None
+    close = close.sort_index()
+    close.columns = close.columns.astype(str).str.upper()
+    return close
 
 
 # --------------------------------------------------------------------------------------
 # Yahoo Finance: ETF Prices
 # --------------------------------------------------------------------------------------
 
+class _EmptyDownload(Exception):
+    """Raised inside the lru_cache'd download so empty/failed results are not memoized."""
+
+
 class YFinancePriceProvider(PriceProvider):
     """
     Fetches daily adjusted-close prices for ETFs using Yahoo Finance.
     """
     def __init__(self):
-        import yfinance as yf
-        self.yf = yf
+        # Per-instance memo of (tickers, start) -> close frame; a new provider starts empty
+        self._download_cached = lru_cache(maxsize=16)(self._download_close)
 
     def get_adjusted_close(self, tickers: List[str], start: str) -> pd.DataFrame:
-        tickers = [str(t).upper().strip() for t in tickers if isinstance(t, str) and t.strip()]
-        tickers = list(dict.fromkeys(tickers))  # de-dup
+        # Upper-case + de-dup in one pass; sorted so the same ticker set hits the same cache entry
+        key = tuple(sorted({t.strip().upper() for t in tickers if isinstance(t, str) and t.strip()}))
 
-        if not tickers:
+        if not key:
             return pd.DataFrame()
 
-        data = self.yf.download(
-            tickers=tickers,
-            start=start,
-            auto_adjust=True,
-            progress=False,
-            group_by="column",
-            threads=True,
-        )
-
-        if not isinstance(data, pd.DataFrame) or data.empty:
-            return pd.DataFrame()
+        # Copy so callers cannot mutate the cached frame
+        return self._download_memo(key, start).copy()
 
+    def _download_memo(self, tickers: Tuple[str, ...], start: str) -> pd.DataFrame:
         try:
-            close = data["Close"]
-        except Exception:
-            return pd.DataFrame()
-
-        if isinstance(close, pd.Series):
-            close = close.to_frame()
-
-        close = close.sort_index()
-        close.columns = [str(c).upper() for c in close.columns]
+            return self._download_cached(tickers, start)
+        except _EmptyDownload:
+            return pd.DataFrame()  # not memoized: the next call asks Yahoo again
+
+    def _download_close(self, tickers: Tuple[str, ...], start: str) -> pd.DataFrame:
+        close = _download_close_block(list(tickers), start)
+        if close.empty:
+            raise _EmptyDownload
         return close
 
 
@@ -177,64 +201,65 @@ class YahooFXProvider(FXProvider):
         "Kuwait": {"ticker": "KWD=X", "invert": True},
     }
 
-    def __init__(self, print_missing: bool = True, print_failed: bool = True):
-        import yfinance as yf
-        self.yf = yf
+    # Resolved once at import: canonical country key -> (ticker, invert)
+    _FX_RESOLVED: Dict[str, Tuple[str, bool]] = {
+        k.strip().lower(): (str(v["ticker"]), bool(v.get("invert", True)))
+        for k, v in FX_MAP.items()
+    }
+
+    def __init__(
+        self,
+        print_missing: bool = True,
+        print_failed: bool = True,
+    ):
         self.print_missing = print_missing
         self.print_failed = print_failed
 
-    def _resolve(self, country: str) -> Optional[Dict[str, Any]]:
-        spec = self.FX_MAP.get(country)
-        if not spec:
-            return None
-        return {
-            "ticker": str(spec["ticker"]),
-            "invert": bool(spec.get("invert", True)),
-        }
+    def _resolve(self, country: str) -> Optional[Tuple[str, bool]]:
+        return self._FX_RESOLVED.get(str(country).strip().lower())
 
     def get_fx_vs_usd(self, countries: List[str], start: str) -> pd.DataFrame:
         series: Dict[str, pd.Series] = {}
         missing: List[str] = []
         failed: List[Tuple[str, str, str]] = []
 
+        specs: Dict[str, Tuple[str, bool]] = {}
         for country in countries:
             spec = self._resolve(country)
             if spec is None:
                 missing.append(country)
                 continue
+            specs[country] = spec
 
-            ticker = spec["ticker"]
-            invert = spec["invert"]
+        # Single bulk download for all unique FX tickers (many countries share one, e.g. EUR=X)
+        unique_tickers = sorted({ticker for ticker, _ in specs.values()})
+        close_df = pd.DataFrame()
 
+        if unique_tickers:
             try:
-                data = self.yf.download(
-                    tickers=ticker,
-                    start=start,
-                    auto_adjust=True,
-                    progress=False,
-                    threads=True,
-                )
+                close_df = _download_close_block(unique_tickers, start)
             except Exception as e:
-                failed.append((country, ticker, f"exception:{type(e).__name__}"))
-                continue
+                for country, (ticker, _) in specs.items():
+                    failed.append((country, ticker, f"exception:{type(e).__name__}"))
+                specs = {}
+
+        if not close_df.empty:
+            # Normalize dtype / index once for the whole block, not per country
+            close_df = close_df.astype(np.float64, copy=False)
+            close_df.index = pd.to_datetime(close_df.index)
 
-            px = _extract_close_as_series(data, ticker)
-            if px is None:
+        for country, (ticker, invert) in specs.items():
+            if ticker not in close_df.columns:
                 failed.append((country, ticker, "close_unreadable"))
                 continue
 
-            px = px.dropna().astype(float)
-            if px.empty:
+            col = close_df[ticker]
+            if col.isna().all():
                 failed.append((country, ticker, "empty_close"))
                 continue
 
+            px = col.dropna()
             fx = (1.0 / px) if invert else px
-            fx = fx.dropna()
-            if fx.empty:
-                failed.append((country, ticker, "empty_fx"))
-                continue
-
-            fx.index = pd.to_datetime(fx.index)
             fx.name = country
             series[country] = fx
 
@@ -255,3 +280,143 @@ class YahooFXProvider(FXProvider):
         out.columns = list(series.keys())
         out = out.sort_index()
         return out
+
+
+# --------------------------------------------------------------------------------------
+# On-disk Parquet cache (per symbol, refreshed daily after the US close)
+# --------------------------------------------------------------------------------------
+
+DEFAULT_DISK_CACHE_DIR = Path("data") / "cache"
+# US equities close 16:00 ET = 20:00 UTC (EDT) / 21:00 UTC (EST); 21:00 UTC is after both
+DAILY_REFRESH_HOUR_UTC = 21
+
+_UNSAFE_FILENAME_RE = re.compile(r"[^A-Za-z0-9._=^-]+")
+
+
+class _ParquetSeriesCache:
+    """
+    One Parquet file per (symbol, start): {cache_dir}/{symbol}_{start}.parquet.
+    A file is fresh if written after the most recent refresh_hour_utc cutoff (default
+    21:00 UTC, after the US close), so a file written mid-session expires that evening.
+    refresh=True skips reads (but still writes). All-NaN columns (failed downloads) are
+    never written, so they are retried. Requires pyarrow; without it every lookup is a miss.
+    """
+    def __init__(
+        self,
+        cache_dir: Path = DEFAULT_DISK_CACHE_DIR,
+        refresh: bool = False,
+        refresh_hour_utc: int = DAILY_REFRESH_HOUR_UTC,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.refresh = refresh
+        self.refresh_hour_utc = refresh_hour_utc
+
+    def _path(self, symbol: str, start: str) -> Path:
+        name = _UNSAFE_FILENAME_RE.sub("_", f"{symbol}_{start}")
+        return self.cache_dir / f"{name}.parquet"
+
+    def _cutoff(self) -> float:
+        now = datetime.now(timezone.utc)
+        cutoff = now.replace(hour=self.refresh_hour_utc, minute=0, second=0, microsecond=0)
+        if cutoff > now:
+            cutoff -= timedelta(days=1)
+        return cutoff.timestamp()
+
+    def load(self, symbols: List[str], start: str) -> Dict[str, pd.Series]:
+        out: Dict[str, pd.Series] = {}
+        if self.refresh:
+            return out
+
+        cutoff = self._cutoff()
+        for sym in symbols:
+            path = self._path(sym, start)
+            try:
+                if path.stat().st_mtime <= cutoff:
+                    continue
+                s = pd.read_parquet(path, engine="pyarrow").iloc[:, 0]
+            except (ImportError, OSError, ValueError, IndexError):
+                continue  # missing / stale-format / no pyarrow -> treat as a miss
+            if s.isna().all():
+                continue  # failed download written by an older version -> re-fetch
+            s.name = sym
+            out[sym] = s
+        return out
+
+    def save(self, frame: pd.DataFrame, start: str) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for sym in frame.columns:
+                if frame[sym].isna().all():
+                    continue  # failed ticker: leave it to be re-fetched next run
+                frame[[sym]].to_parquet(self._path(str(sym), start), index=True, engine="pyarrow")
+        except (ImportError, OSError, ValueError):
+            pass
+
+
+class DiskCachedPriceProvider(PriceProvider):
+    """
+    Memoizes another PriceProvider on disk, one Parquet file per ticker.
+    """
+    def __init__(
+        self,
+        inner: PriceProvider,
+        cache_dir: Path = DEFAULT_DISK_CACHE_DIR,
+        refresh: bool = False,
+        refresh_hour_utc: int = DAILY_REFRESH_HOUR_UTC,
+    ):
+        self.inner = inner
+        self.disk = _ParquetSeriesCache(cache_dir, refresh=refresh, refresh_hour_utc=refresh_hour_utc)
+
+    def _missing(self, tickers: List[str], start: str) -> Tuple[Dict[str, pd.Series], List[str]]:
+        key = sorted({t.strip().upper() for t in tickers if isinstance(t, str) and t.strip()})
+        hits = self.disk.load(key, start)
+        return hits, [t for t in key if t not in hits]
+
+    def get_adjusted_close(self, tickers: List[str], start: str) -> pd.DataFrame:
+        hits, missing = self._missing(tickers, start)
+        parts: List[Any] = list(hits.values())
+
+        if missing:
+            fresh = self.inner.get_adjusted_close(missing, start)
+            if not fresh.empty:
+                self.disk.save(fresh, start)
+                parts.append(fresh)
+
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, axis=1).sort_index()
+
+
+class DiskCachedFXProvider(FXProvider):
+    """
+    Memoizes another FXProvider on disk, one Parquet file per country series.
+    """
+    def __init__(
+        self,
+        inner: FXProvider,
+        cache_dir: Path = DEFAULT_DISK_CACHE_DIR,
+        refresh: bool = False,
+        refresh_hour_utc: int = DAILY_REFRESH_HOUR_UTC,
+    ):
+        self.inner = inner
+        self.disk = _ParquetSeriesCache(cache_dir, refresh=refresh, refresh_hour_utc=refresh_hour_utc)
+
+    def _missing(self, countries: List[str], start: str) -> Tuple[Dict[str, pd.Series], List[str]]:
+        key = list(dict.fromkeys(countries))
+        hits = self.disk.load([f"FX_{c}" for c in key], start)
+        hits = {c: hits[f"FX_{c}"].rename(c) for c in key if f"FX_{c}" in hits}
+        return hits, [c for c in key if c not in hits]
+
+    def get_fx_vs_usd(self, countries: List[str], start: str) -> pd.DataFrame:
+        hits, missing = self._missing(countries, start)
+        parts: List[Any] = list(hits.values())
+
+        if missing:
+            fresh = self.inner.get_fx_vs_usd(missing, start)
+            if not fresh.empty:
+                self.disk.save(fresh.add_prefix("FX_"), start)
+                parts.append(fresh)
+
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, axis=1).sort_index()
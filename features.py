@@ -9,6 +9,8 @@ from typing import Optional
 import numpy as np
 import pandas as pd
 
+from _njit import HAVE_NUMBA, njit
+
 
 def pct_change_n_days(s: pd.Series, n_days: int) -> float:
     """
@@ -17,14 +19,67 @@ def pct_change_n_days(s: pd.Series, n_days: int) -> float:
     """
     if s is None or not isinstance(s, pd.Series):
         return float("nan")
-    s = s.dropna()
-    if len(s) <= n_days:
-        return float("nan")
-    start = float(s.iloc[-n_days - 1])
-    end = float(s.iloc[-1])
-    if start == 0.0:
-        return float("nan")
-    return (end / start) - 1.0
+    return float(pct_change_last_n(s.dropna().to_frame(), n_days).iloc[0])
+
+
+def _valid_ranks(a: np.ndarray):
+    """
+    Per column of a 2D float array: valid mask, 1-based rank of each valid value
+    (its position in the column after dropna), and the count of valid values.
+    """
+    valid = ~np.isnan(a)
+    rank = np.cumsum(valid, axis=0)
+    return valid, rank, rank[-1]
+
+
+def _pick_rank(a: np.ndarray, valid: np.ndarray, rank: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Per column, the valid value whose rank equals target (NaN where there is none).
+    """
+    hit = valid & (rank == target)
+    out = a[hit.argmax(axis=0), np.arange(a.shape[1])]
+    out[~hit.any(axis=0)] = np.nan
+    return out
+
+
+def pct_change_last_n(df: pd.DataFrame, n: int) -> pd.Series:
+    """
+    Batch form of pct_change_n_days: percent change over each column's last n valid
+    observations (gaps are skipped per column, as with s.dropna(); no forward-fill needed).
+    Returns NaN where history is insufficient or the starting value is 0.
+    """
+    if df is None or not isinstance(df, pd.DataFrame):
+        return pd.Series(dtype=float)
+    if len(df) <= n:
+        return pd.Series(np.nan, index=df.columns, dtype=float)
+
+    a = df.to_numpy(dtype=np.float64)
+    valid, rank, cnt = _valid_ranks(a)
+    end = _pick_rank(a, valid, rank, cnt)
+    start = _pick_rank(a, valid, rank, cnt - n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = end / start - 1.0
+    out[(cnt <= n) | (start == 0.0)] = np.nan
+    return pd.Series(out, index=df.columns)
+
+
+def last_above_trailing_mean(df: pd.DataFrame, window: int) -> pd.Series:
+    """
+    Batch trend check: per column, is the latest valid value above the mean of the last
+    `window` valid values (gaps skipped, as with moving_average on s.dropna())?
+    False where a column has fewer than `window` valid values.
+    """
+    if df is None or not isinstance(df, pd.DataFrame) or df.empty:
+        cols = df.columns if isinstance(df, pd.DataFrame) else []
+        return pd.Series(False, index=cols, dtype=bool)
+
+    a = df.to_numpy(dtype=np.float64)
+    valid, rank, cnt = _valid_ranks(a)
+    in_window = valid & (rank > cnt - window)
+    ma = np.where(in_window, a, 0.0).sum(axis=0) / window
+    last = _pick_rank(a, valid, rank, cnt)
+    # NaN `last` (empty column) compares False
+    return pd.Series((cnt >= window) & (last > ma), index=df.columns)
 
 
 def moving_average(s: pd.Series, window: int) -> Optional[pd.Series]:
@@ -50,17 +105,19 @@ def zscore_cross_section(x: pd.Series) -> pd.Series:
     if x is None or not isinstance(x, pd.Series):
         return pd.Series(dtype=float)
 
-    x = x.astype(float)
-    mu = x.mean(skipna=True)
-    sigma = x.std(skipna=True)
+    # float32 input stays float32; anything else is computed in float64
+    dtype = np.float32 if x.dtype == np.float32 else np.float64
+    arr = x.to_numpy(dtype=dtype, na_value=np.nan)
+    vals = arr[~np.isnan(arr)]
+    sigma = vals.std(ddof=1) if vals.size > 1 else np.nan  # ddof=1 matches pandas .std()
 
-    if sigma is None or np.isnan(sigma) or sigma < 1e-12:
+    if not np.isfinite(sigma) or sigma < 1e-12:
         # All equal or insufficient variance -> 0 for non-NaN
-        out = x.copy()
-        out.loc[~out.isna()] = 0.0
-        return out
+        z = np.where(np.isnan(arr), np.nan, 0.0)
+    else:
+        z = (arr - vals.mean()) / sigma
 
-    return (x - mu) / sigma
+    return pd.Series(z, index=x.index, name=x.name)
 
 
 def safe_clip(x: pd.Series, lo: float, hi: float) -> pd.Series:
@@ -108,3 +165,86 @@ def relative_strength(etf_px: pd.Series, bench_px: pd.Series, n_days: int = 252)
         return float("nan")
 
     return etf_ret - bench_ret
+
+
+# --------------------------------------------------------------------------------------
+# Compiled scoring kernel (numba). Mirrors the pandas path in CountryRanker.
+# --------------------------------------------------------------------------------------
+
+@njit(cache=True)
+def _zscore_into(x: np.ndarray, out: np.ndarray) -> None:
+    """
+    zscore_cross_section on a float vector, written into `out`.
+    """
+    n = x.shape[0]
+    cnt = 0
+    total = 0.0
+    for i in range(n):
+        if not np.isnan(x[i]):
+            cnt += 1
+            total += x[i]
+
+    mu = total / cnt if cnt > 0 else np.nan
+    sigma = np.nan
+    if cnt > 1:
+        ss = 0.0
+        for i in range(n):
+            if not np.isnan(x[i]):
+                ss += (x[i] - mu) ** 2
+        sigma = np.sqrt(ss / (cnt - 1))
+
+    degenerate = not (sigma >= 1e-12)  # also True for NaN
+    for i in range(n):
+        if np.isnan(x[i]):
+            out[i] = np.nan
+        elif degenerate:
+            out[i] = 0.0
+        else:
+            out[i] = (x[i] - mu) / sigma
+
+
+@njit(cache=True)
+def score_kernel(
+    X: np.ndarray,
+    fx_mult: np.ndarray,
+    weights: np.ndarray,
+    fill_missing: bool,
+    clip: bool,
+    clip_lo: float,
+    clip_hi: float,
+) -> np.ndarray:
+    """
+    Weighted composite score from raw features.
+    X: (n, m) float32/float64, one raw feature per column (column 1 is FX, scaled by fx_mult).
+    Per column: cross-sectional z-score, optional NaN->0, optional clip. Then weighted sum,
+    optionally clipped. NaN propagates to the score when fill_missing is False.
+    """
+    n, m = X.shape
+    Z = np.empty((n, m), dtype=X.dtype)
+    col = np.empty(n, dtype=X.dtype)
+    for j in range(m):
+        _zscore_into(np.ascontiguousarray(X[:, j]), col)
+        Z[:, j] = col
+
+    score = np.empty(n, dtype=X.dtype)
+    for i in range(n):
+        acc = 0.0
+        for j in range(m):
+            z = Z[i, j]
+            if fill_missing and np.isnan(z):
+                z = 0.0
+            if clip:
+                if z < clip_lo:
+                    z = clip_lo
+                elif z > clip_hi:
+                    z = clip_hi
+            if j == 1:
+                z *= fx_mult[i]
+            acc += weights[j] * z
+        if clip:
+            if acc < clip_lo:
+                acc = clip_lo
+            elif acc > clip_hi:
+                acc = clip_hi
+        score[i] = acc
+    return score
@@ -16,18 +16,40 @@
 from __future__ import annotations
 
 from dataclasses import asdict
-from typing import Optional, Dict, Any, List
 
 import numpy as np
 import pandas as pd
 
 from config import ModelConfig
 from features import (
-    pct_change_n_days,
-    moving_average,
+    HAVE_NUMBA,
+    last_above_trailing_mean,
+    pct_change_last_n,
+    score_kernel,
     zscore_cross_section,
 )
 
+# Precision for the scoring stage. Momentum/z-score math does not need float64 and the
+# composite is clipped to a narrow range, so float32 halves memory traffic at no practical cost.
+SCORE_DTYPE = np.float32
+
+# Feature columns cast to SCORE_DTYPE before scoring (user-entered PolicyRate/CPI_YoY stay float64)
+SCORE_COLS = ("ETF_Mom_12m", "FX_Mom_12m", "FX_Mom_3m", "RealRate", "RateChange_3M")
+
+# Below this many eligible rows the pandas path is faster than paying numba's JIT/cache load
+# (the shipped universe is ~40 rows); the compiled kernel only pays off in large cross-sections.
+_NJIT_MIN_ROWS = 200
+
+# Manual macro columns from the Excel universe (coerced to numeric once per rank)
+MACRO_COLS = [
+    "PolicyRate",
+    "PolicyRate_3M_Ago",
+    "CPI_YoY",
+    "GrowthMomentum",
+    "CurrentAccount_GDP",
+    "RiskFlag",
+]
+
 
 class CountryRanker:
     def __init__(self, cfg: ModelConfig, price_provider, fx_provider):
@@ -40,36 +62,58 @@ class CountryRanker:
     # Helpers
     # ------------------------------------------------------------------
 
-    def _safe_float(self, x) -> float:
-        try:
-            if x is None or (isinstance(x, float) and np.isnan(x)):
-                return np.nan
-            return float(x)
-        except Exception:
-            return np.nan
-
-    def _fx_regime_multiplier(self, fx_regime: Optional[str]) -> float:
+    def _trend_ok(self, etf_px: pd.DataFrame) -> pd.Series:
         """
-        Reduce the impact of FX signals for pegged regimes.
-        cfg.fx_peg_penalty = fraction to penalize (e.g., 0.70 => keep 30% of FX)
+        Latest close above its moving average (over each ticker's own last ma_trend_days
+        closes), per ticker column. False where there is less than ma_trend_days of history.
         """
-        if not fx_regime:
-            return 1.0
-        if str(fx_regime).strip().lower() == "pegged":
-            return max(0.0, 1.0 - float(self.cfg.fx_peg_penalty))
-        return 1.0
-
-    def _trend_ok(self, etf_px: pd.Series) -> bool:
-        ma = moving_average(etf_px, self.cfg.ma_trend_days)
-        if ma is None or ma.empty or etf_px is None or etf_px.empty:
-            return False
-        # latest close above MA
-        return bool(etf_px.iloc[-1] > ma.iloc[-1])
+        return last_above_trailing_mean(etf_px, self.cfg.ma_trend_days)
 
     def _clip(self, s: pd.Series) -> pd.Series:
         if not self.cfg.clip_scores:
             return s
-        return s.clip(self.cfg.score_clip_min, self.cfg.score_clip_max)
+        a = s.to_numpy(dtype=SCORE_DTYPE, copy=True)
+        np.clip(a, self.cfg.score_clip_min, self.cfg.score_clip_max, out=a)
+        return pd.Series(a, index=s.index, name=s.name)
+
+    def _score_pandas(self, raw, fx_mult: np.ndarray, w: np.ndarray) -> np.ndarray:
+        """
+        Reference scoring path (used when numba is not installed).
+        raw: [equity, FX combo, RealRate, RateChange_3M, structural] Series, same index.
+        """
+        z_equity, z_fx, z_real, z_ratechg, z_struct = (zscore_cross_section(c) for c in raw)
+
+        # Missing handling (important to avoid NaN score)
+        if self.cfg.fill_missing_with_zero:
+            z_equity = z_equity.fillna(0.0)
+            z_fx = z_fx.fillna(0.0)
+            z_real = z_real.fillna(0.0)
+            z_ratechg = z_ratechg.fillna(0.0)
+            z_struct = z_struct.fillna(0.0)
+
+        # Clip extreme z-scores
+        z_equity = self._clip(z_equity)
+        z_fx = self._clip(z_fx)
+        z_real = self._clip(z_real)
+        z_ratechg = self._clip(z_ratechg)
+        z_struct = self._clip(z_struct)
+
+        z_fx_adj = z_fx * fx_mult
+
+        # Single (n, 5) @ (5,) product instead of five weighted Series additions
+        Z = np.column_stack([
+            z_equity.to_numpy(dtype=SCORE_DTYPE),
+            z_fx_adj.to_numpy(dtype=SCORE_DTYPE),
+            z_real.to_numpy(dtype=SCORE_DTYPE),
+            z_ratechg.to_numpy(dtype=SCORE_DTYPE),
+            z_struct.to_numpy(dtype=SCORE_DTYPE),
+        ])
+        score = Z @ w
+
+        if self.cfg.clip_scores:
+            np.clip(score, self.cfg.score_clip_min, self.cfg.score_clip_max, out=score)
+
+        return score
 
     # ------------------------------------------------------------------
     # Main API
@@ -82,159 +126,172 @@ class CountryRanker:
         """
         df = universe.copy()
 
+        # Coerce macro columns once (non-numeric -> NaN, missing column -> all NaN)
+        for c in MACRO_COLS:
+            df[c] = pd.to_numeric(df[c], errors="coerce") if c in df.columns else np.nan
+
         # ---- Fetch market data -------------------------------------------------------
         etfs = df["ETF"].astype(str).str.upper().tolist()
         countries = df["Country"].astype(str).tolist()
 
+        # Sequential: the Yahoo providers serialize yf.download (shared module state)
         etf_px = self.px.get_adjusted_close(etfs, start=start)  # columns=tickers
         fx_px = self.fx.get_fx_vs_usd(countries, start=start)   # columns=countries
 
-        # ---- Build per-country features ----------------------------------------------
-        rows: List[Dict[str, Any]] = []
-
-        for _, row in df.iterrows():
-            country = str(row["Country"])
-            etf = str(row["ETF"]).upper()
-
-            # ETF series
-            s_etf = etf_px[etf].dropna() if (isinstance(etf_px, pd.DataFrame) and etf in etf_px.columns) else pd.Series(dtype=float)
-            # FX series
-            s_fx = fx_px[country].dropna() if (isinstance(fx_px, pd.DataFrame) and country in fx_px.columns) else pd.Series(dtype=float)
-
-            # Equity features
-            etf_mom_12m = pct_change_n_days(s_etf, self.cfg.mom_12m_days)
-            trend_ok = self._trend_ok(s_etf) if len(s_etf) >= self.cfg.ma_trend_days else False
-
-            # FX features (can be empty for pegged/unavailable)
-            fx_mom_12m = pct_change_n_days(s_fx, self.cfg.mom_12m_days)
-            fx_mom_3m = pct_change_n_days(s_fx, self.cfg.mom_3m_days)
-
-            # Manual macro columns
-            policy = self._safe_float(row.get("PolicyRate", np.nan))
-            policy_3m = self._safe_float(row.get("PolicyRate_3M_Ago", np.nan))
-            cpi = self._safe_float(row.get("CPI_YoY", np.nan))
-
-            growth_mom = self._safe_float(row.get("GrowthMomentum", np.nan))
-            ca_gdp = self._safe_float(row.get("CurrentAccount_GDP", np.nan))
-            riskflag = self._safe_float(row.get("RiskFlag", np.nan))
-            fx_regime = row.get("FX_Regime", None)
-
-            # Derived macro
-            real_rate = policy - cpi if (not np.isnan(policy) and not np.isnan(cpi)) else np.nan
-            rate_change_3m = policy - policy_3m if (not np.isnan(policy) and not np.isnan(policy_3m)) else np.nan
-
-            rows.append({
-                "Country": country,
-                "ETF": etf,
-                "Trend_OK": bool(trend_ok),
-                "ETF_Mom_12m": etf_mom_12m,
-                "FX_Mom_12m": fx_mom_12m,
-                "FX_Mom_3m": fx_mom_3m,
-                "PolicyRate": policy,
-                "PolicyRate_3M_Ago": policy_3m,
-                "CPI_YoY": cpi,
-                "RealRate": real_rate,
-                "RateChange_3M": rate_change_3m,
-                "GrowthMomentum": growth_mom,
-                "CurrentAccount_GDP": ca_gdp,
-                "RiskFlag": riskflag,
-                "FX_Regime": fx_regime,
-            })
-
-        feat = pd.DataFrame(rows)
+        # ---- Build per-country features (vectorized across the universe) -------------
+        # No forward-fill: the batch features index each column by its own valid closes
+        etf_px = etf_px.sort_index() if isinstance(etf_px, pd.DataFrame) else pd.DataFrame()
+        fx_px = fx_px.sort_index() if isinstance(fx_px, pd.DataFrame) else pd.DataFrame()
+
+        # Equity features (indexed by ticker)
+        etf_mom_12m = pct_change_last_n(etf_px, self.cfg.mom_12m_days)
+        trend_ok = self._trend_ok(etf_px)
+
+        # FX features (indexed by country; can be missing for pegged/unavailable)
+        fx_mom_12m = pct_change_last_n(fx_px, self.cfg.mom_12m_days)
+        fx_mom_3m = pct_change_last_n(fx_px, self.cfg.mom_3m_days)
+
+        # One contiguous array per feature (columnar), aligned to universe row order.
+        # Manual macro columns are stored as nullable Float64 (values + NA mask) in `feat`.
+        macro = {c: df[c].to_numpy(dtype=np.float64, na_value=np.nan) for c in MACRO_COLS}
+        policy = macro["PolicyRate"]
+        policy_3m = macro["PolicyRate_3M_Ago"]
+        cpi = macro["CPI_YoY"]
+
+        # FX_Regime keeps its dtype (Categorical from universe.py)
+        fx_regime = (
+            df["FX_Regime"].array
+            if "FX_Regime" in df.columns
+            else np.full(len(df), None, dtype=object)
+        )
+
+        feat = pd.DataFrame({
+            "Country": np.asarray(countries, dtype=object),
+            "ETF": np.asarray(etfs, dtype=object),
+            "Trend_OK": trend_ok.reindex(etfs, fill_value=False).to_numpy(dtype=bool),
+            "ETF_Mom_12m": etf_mom_12m.reindex(etfs).to_numpy(dtype=np.float64),
+            "FX_Mom_12m": fx_mom_12m.reindex(countries).to_numpy(dtype=np.float64),
+            "FX_Mom_3m": fx_mom_3m.reindex(countries).to_numpy(dtype=np.float64),
+            "PolicyRate": pd.array(policy, dtype="Float64"),
+            "PolicyRate_3M_Ago": pd.array(policy_3m, dtype="Float64"),
+            "CPI_YoY": pd.array(cpi, dtype="Float64"),
+            # Derived macro (NaN if either input is missing)
+            "RealRate": policy - cpi,
+            "RateChange_3M": policy - policy_3m,
+            "GrowthMomentum": pd.array(macro["GrowthMomentum"], dtype="Float64"),
+            "CurrentAccount_GDP": pd.array(macro["CurrentAccount_GDP"], dtype="Float64"),
+            "RiskFlag": pd.array(macro["RiskFlag"], dtype="Float64"),
+            "FX_Regime": fx_regime,
+        })
 
         # ---- Gates / eligibility ------------------------------------------------------
-        eligible = feat.copy()
+        # Combine all gates into one mask and filter once (downstream only reads `eligible`)
+        mask = np.ones(len(feat), dtype=bool)
 
         if self.cfg.require_etf_above_ma200:
-            eligible = eligible[eligible["Trend_OK"] == True].copy()
+            mask &= feat["Trend_OK"].to_numpy(dtype=bool)
+
+        if self.cfg.drop_if_missing_policy_rate:
+            mask &= ~feat["PolicyRate"].isna().to_numpy()
 
-        if self.cfg.drop_if_missing_policy_rate and "PolicyRate" in eligible.columns:
-            eligible = eligible[~eligible["PolicyRate"].isna()].copy()
+        if self.cfg.drop_if_missing_cpi:
+            mask &= ~feat["CPI_YoY"].isna().to_numpy()
 
-        if self.cfg.drop_if_missing_cpi and "CPI_YoY" in eligible.columns:
-            eligible = eligible[~eligible["CPI_YoY"].isna()].copy()
+        eligible = feat.loc[mask]
 
         if eligible.empty:
             return eligible
 
-        # ---- Cross-sectional standardization -----------------------------------------
-        # Equity z-score
-        z_equity = zscore_cross_section(eligible["ETF_Mom_12m"])
-        # FX combo: average of 12m and 3m momentums
-        fx_combo = (eligible["FX_Mom_12m"].astype(float) + eligible["FX_Mom_3m"].astype(float)) / 2.0
-        z_fx = zscore_cross_section(fx_combo)
+        eligible = eligible.astype({c: SCORE_DTYPE for c in SCORE_COLS})
 
-        # Macro z-scores:
-        # RealRate: higher is better
-        z_real = zscore_cross_section(eligible["RealRate"])
-        # RateChange: easing (negative) can be good for growth, tightening (positive) can be good for FX.
-        # We treat this as *directional* and let the z-score decide cross-sectionally.
-        z_ratechg = zscore_cross_section(eligible["RateChange_3M"])
+        # ---- Raw cross-sectional inputs ----------------------------------------------
+        # FX combo: average of 12m and 3m momentums
+        fx_combo = (eligible["FX_Mom_12m"] + eligible["FX_Mom_3m"]) / 2.0
 
         # Structural: combine GrowthMomentum + CurrentAccount - RiskFlag penalty
         structural_raw = pd.Series(0.0, index=eligible.index, dtype=float)
 
         if "GrowthMomentum" in eligible.columns:
-            structural_raw = structural_raw.add(eligible["GrowthMomentum"].fillna(0.0))
+            structural_raw = structural_raw.add(eligible["GrowthMomentum"].fillna(0))
 
         if "CurrentAccount_GDP" in eligible.columns:
             # scale down CA to avoid dominating (CA is in % GDP)
-            structural_raw = structural_raw.add(0.2 * eligible["CurrentAccount_GDP"].fillna(0.0))
+            structural_raw = structural_raw.add(0.2 * eligible["CurrentAccount_GDP"].fillna(0))
 
         if "RiskFlag" in eligible.columns:
             # higher riskflag => penalty
-            structural_raw = structural_raw.sub(0.75 * eligible["RiskFlag"].fillna(0.0))
-
-        z_struct = zscore_cross_section(structural_raw)
-
-        # Missing handling (important to avoid NaN score)
-        if self.cfg.fill_missing_with_zero:
-            z_equity = z_equity.fillna(0.0)
-            z_fx = z_fx.fillna(0.0)
-            z_real = z_real.fillna(0.0)
-            z_ratechg = z_ratechg.fillna(0.0)
-            z_struct = z_struct.fillna(0.0)
-
-        # Clip extreme z-scores
-        z_equity = self._clip(z_equity)
-        z_fx = self._clip(z_fx)
-        z_real = self._clip(z_real)
-        z_ratechg = self._clip(z_ratechg)
-        z_struct = self._clip(z_struct)
+            structural_raw = structural_raw.sub(0.75 * eligible["RiskFlag"].fillna(0))
 
         # ---- FX regime adjustment -----------------------------------------------------
-        fx_mult = eligible["FX_Regime"].apply(self._fx_regime_multiplier).astype(float)
-        z_fx_adj = z_fx * fx_mult
+        # Reduce the impact of FX signals for pegged regimes.
+        # cfg.fx_peg_penalty = fraction to penalize (e.g., 0.70 => keep 30% of FX)
+        mult_map = {"pegged": max(0.0, 1.0 - float(self.cfg.fx_peg_penalty))}
+        fx_mult = (
+            eligible["FX_Regime"].astype(object).fillna("").astype(str).str.strip().str.lower()
+            .map(mult_map)
+            .fillna(1.0)
+            .to_numpy(dtype=SCORE_DTYPE)
+        )
+
+        # ---- Score -------------------------------------------------------------------
+        # Column order matches the weight vector: equity, FX, real rate, rate change, structural
+        raw = [
+            eligible["ETF_Mom_12m"],
+            fx_combo,
+            # RealRate: higher is better
+            eligible["RealRate"],
+            # RateChange: easing (negative) can be good for growth, tightening (positive) can be good for FX.
+            # We treat this as *directional* and let the z-score decide cross-sectionally.
+            eligible["RateChange_3M"],
+            structural_raw,
+        ]
+        w = np.array([
+            self.cfg.weight_equity,
+            self.cfg.weight_fx,
+            self.cfg.weight_real_rate,
+            self.cfg.weight_rate_change,
+            self.cfg.weight_structural,
+        ], dtype=SCORE_DTYPE)
+
+        if HAVE_NUMBA and len(eligible) >= _NJIT_MIN_ROWS:
+            X = np.ascontiguousarray(
+                np.column_stack([c.to_numpy(dtype=SCORE_DTYPE, na_value=np.nan) for c in raw])
+            )
+            score = score_kernel(
+                X,
+                fx_mult,
+                w,
+                self.cfg.fill_missing_with_zero,
+                self.cfg.clip_scores,
+                float(self.cfg.score_clip_min),
+                float(self.cfg.score_clip_max),
+            )
+        else:
+            score = self._score_pandas(raw, fx_mult, w)
 
         # ---- Optional veto: FX breakdown ---------------------------------------------
+        # Applied after scoring: z-scores are cross-sectional over the pre-veto set
         if self.cfg.hard_veto_on_fx_breakdown:
             # If FX 12m < 0, exclude
-            eligible = eligible[eligible["FX_Mom_12m"].fillna(0.0) >= 0.0].copy()
-            # align z-scores
-            z_equity = z_equity.loc[eligible.index]
-            z_fx_adj = z_fx_adj.loc[eligible.index]
-            z_real = z_real.loc[eligible.index]
-            z_ratechg = z_ratechg.loc[eligible.index]
-            z_struct = z_struct.loc[eligible.index]
-
-        # ---- Score -------------------------------------------------------------------
-        score = (
-            self.cfg.weight_equity * z_equity
-            + self.cfg.weight_fx * z_fx_adj
-            + self.cfg.weight_real_rate * z_real
-            + self.cfg.weight_rate_change * z_ratechg
-            + self.cfg.weight_structural * z_struct
-        )
-
-        if self.cfg.clip_scores:
-            score = score.clip(self.cfg.score_clip_min, self.cfg.score_clip_max)
-
-        eligible["Score"] = score
-
-        # Sort and return top K
-        eligible = eligible.sort_values("Score", ascending=False).reset_index(drop=True)
-        topk = eligible.head(self.cfg.top_k).copy()
+            keep = (eligible["FX_Mom_12m"].fillna(0.0) >= 0.0).to_numpy()
+            eligible = eligible.loc[keep]
+            score = score[keep]
+
+        eligible = eligible.assign(Score=score)
+
+        # Select top K with a partial sort: O(N) partition, then sort only the K winners.
+        # NaN scores rank last; ties (incl. NaN) at the cut are taken in universe order.
+        k = min(self.cfg.top_k, len(score))
+        if k > 0:
+            key = np.where(np.isnan(score), -np.inf, score)
+            kth = np.partition(key, len(key) - k)[len(key) - k]  # k-th largest key
+            above = np.flatnonzero(key > kth)
+            ties = np.flatnonzero(key == kth)[: k - len(above)]
+            idx = np.sort(np.concatenate([above, ties]))
+            idx = idx[np.argsort(-key[idx], kind="stable")]
+        else:
+            idx = np.empty(0, dtype=np.intp)
+        topk = eligible.iloc[idx].reset_index(drop=True)
 
         if self.cfg.verbose:
             print("\n[DEBUG] Config:", asdict(self.cfg))
@@ -12,20 +12,14 @@
 #
 # Usage:
 #   python run_rank.py
+#   python run_rank.py --no-cache   # ignore cached market data and re-download
 #
 # Requirements:
 #   See requirements.txt
 
+import argparse
 from pathlib import Path
-import pandas as pd
-
-from config import ModelConfig
-from universe import load_country_universe
-from model import CountryRanker
-from data_providers import (
-    YFinancePriceProvider,
-    YahooFXProvider,
-)
+from typing import List, Optional
 
 # --------------------------------------------------------------------------------------
 # Paths
@@ -36,6 +30,7 @@ DATA_DIR = BASE_DIR / "data"
 
 UNIVERSE_XLSX = DATA_DIR / "Country ETF list.xlsx"
 OUTPUT_CSV = DATA_DIR / "top10_countries.csv"
+CACHE_DIR = DATA_DIR / "cache"  # per-symbol Parquet price/FX cache
 
 START_DATE = "2015-01-01"  # enough history for MA200 + 12M momentum
 
@@ -43,7 +38,15 @@ START_DATE = "2015-01-01"  # enough history for MA200 + 12M momentum
 # Main
 # --------------------------------------------------------------------------------------
 
-def main():
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Rank country ETFs on market + macro features.")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Force a fresh download of ETF prices and FX (cached files are rewritten).",
+    )
+    args = parser.parse_args(argv)
+
     # ---- Sanity checks ---------------------------------------------------------------
     if not UNIVERSE_XLSX.exists():
         raise FileNotFoundError(
@@ -51,19 +54,25 @@ def main():
             "Ensure Country ETF list.xlsx exists in the data/ directory."
         )
 
+    # Heavy imports (pandas, model, providers) deferred so --help / missing-file exit fast
+    import pandas as pd
+
+    from config import ModelConfig
+    from universe import load_country_universe
+    from model import CountryRanker
+    from data_providers import (
+        DiskCachedFXProvider,
+        DiskCachedPriceProvider,
+        YFinancePriceProvider,
+        YahooFXProvider,
+    )
+
     # ---- Load universe (ETF + manual macro) ------------------------------------------
     universe = load_country_universe(str(UNIVERSE_XLSX))
 
     if universe.empty:
         raise RuntimeError("Universe loaded but is empty.")
 
-    # ---- Providers -------------------------------------------------------------------
-    price_provider = YFinancePriceProvider()
-    fx_provider = YahooFXProvider(
-        print_missing=True,
-        print_failed=True
-    )
-
     # ---- Model configuration ---------------------------------------------------------
     cfg = ModelConfig(
         top_k=10,
@@ -82,6 +91,17 @@ def main():
         weight_structural=0.10,
     )
 
+    # ---- Providers -------------------------------------------------------------------
+    price_provider = YFinancePriceProvider()
+    fx_provider = YahooFXProvider(
+        print_missing=True,
+        print_failed=True,
+    )
+
+    # Same-day reruns read prices / FX from data/cache/*.parquet instead of Yahoo
+    price_provider = DiskCachedPriceProvider(price_provider, cache_dir=CACHE_DIR, refresh=args.no_cache)
+    fx_provider = DiskCachedFXProvider(fx_provider, cache_dir=CACHE_DIR, refresh=args.no_cache)
+
     # ---- Ranker ----------------------------------------------------------------------
     ranker = CountryRanker(
         cfg=cfg,
@@ -111,14 +131,15 @@ def main():
         "GrowthMomentum",
         "FX_Regime",
     ]
-    cols = [c for c in cols if c in ranked.columns]
+    # Hash-based intersection; keeps the display order above (not ranked's column order)
+    cols = list(pd.Index(cols).intersection(ranked.columns, sort=False))
 
     print("\n=== TOP FAVORABLE COUNTRIES (MODEL OUTPUT) ===\n")
 
     if ranked.empty:
         print("No eligible countries. Check gates, FX coverage, or data availability.")
     else:
-        print(ranked[cols].to_string(index=False))
+        print(ranked.loc[:, cols].to_string(index=False))
 
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     ranked.to_csv(OUTPUT_CSV, index=False)
@@ -126,17 +147,19 @@ def main():
     print(f"\nSaved output to: {OUTPUT_CSV}")
 
     # ---- Diagnostics -----------------------------------------------------------------
-    print("\nDiagnostics:")
-    print(f"  Universe size: {len(universe)}")
-    print(f"  Eligible after gates: {len(ranked)}")
+    # One dict of counts; optional-column lines only when the column exists
+    diag = {"Universe size": len(universe), "Eligible after gates": len(ranked)}
 
     if "FX_Regime" in universe.columns:
-        pegged = universe["FX_Regime"].fillna("").str.lower().eq("pegged").sum()
-        print(f"  Pegged FX regimes: {pegged}")
+        # NA compares as <NA> and is skipped by sum(), so no fillna("") pass is needed
+        diag["Pegged FX regimes"] = int(universe["FX_Regime"].astype("string").str.lower().eq("pegged").sum())
 
     if "PolicyRate" in universe.columns:
-        missing_rates = universe["PolicyRate"].isna().sum()
-        print(f"  Missing policy rates: {missing_rates}")
+        diag["Missing policy rates"] = int(universe["PolicyRate"].isna().sum())
+
+    print("\nDiagnostics:")
+    for label, value in diag.items():
+        print(f"  {label}: {value}")
 
     print("\nNotes:")
     print("  - Rankings are relative within the universe.")
@@ -11,11 +11,17 @@
 
 from __future__ import annotations
 
+import re
+from functools import lru_cache
+from pathlib import Path
 from typing import Optional
+import numpy as np
 import pandas as pd
 
+from _njit import HAVE_NUMBA, njit
 
-REQUIRED_COLS = {"Country", "ETF"}
+
+REQUIRED_COLS = frozenset({"Country", "ETF"})
 
 # Optional manual macro columns you may maintain in the Excel
 OPTIONAL_COLS = [
@@ -28,34 +34,206 @@ OPTIONAL_COLS = [
     "RiskFlag",            # 0/1/2 (optional)
 ]
 
+# Optional columns parsed with _vec_to_float
+_NUMERIC_OPT_COLS = frozenset({
+    "PolicyRate",
+    "PolicyRate_3M_Ago",
+    "CPI_YoY",
+    "CurrentAccount_GDP",
+    "RiskFlag",
+})
 
-def _clean_str(x) -> str:
-    if pd.isna(x):
-        return ""
-    return str(x).strip()
 
+# GrowthMomentum labels (lower-cased) -> -1 / 0 / +1
+_GM_MAP = {
+    "accelerating": 1.0,
+    "up": 1.0,
+    "positive": 1.0,
+    "+1": 1.0,
+    "1": 1.0,
+    "decelerating": -1.0,
+    "down": -1.0,
+    "negative": -1.0,
+    "-1": -1.0,
+    "flat": 0.0,
+    "0": 0.0,
+    "neutral": 0.0,
+}
 
-def _to_float(x) -> Optional[float]:
-    if pd.isna(x):
-        return None
+
+# FX_Regime labels (lower-cased) -> canonical regime
+_FXR_MAP = {
+    "pegged": "Pegged",
+    "peg": "Pegged",
+    "managed": "Managed",
+    "crawl": "Managed",
+    "band": "Managed",
+    "freefloat": "FreeFloat",
+    "free": "FreeFloat",
+    "float": "FreeFloat",
+    "floating": "FreeFloat",
+}
+
+# Fixed FX_Regime categories (stored as pd.Categorical: int8 codes + one label table)
+FX_REGIMES = ["Pegged", "Managed", "FreeFloat"]
+
+
+# Below this many rows the pandas parse is cheaper than numba's first-call overhead
+_NJIT_MIN_ROWS = 200
+
+# Characters dropped before numeric parsing: percent signs, thousands separators, whitespace
+_FLOAT_CLEAN_RE = re.compile(r"[%,\s]")
+
+_POW10 = np.array([10.0 ** k for k in range(23)])  # exactly representable powers of ten
+
+
+@njit(cache=True)
+def _parse_float_bytes(buf: np.ndarray, out: np.ndarray, ok: np.ndarray) -> None:
+    """
+    Parse one ASCII string per row of `buf` (uint8, NUL-padded) into `out`.
+    Same grammar as _vec_to_float: "%", "," and whitespace are ignored, then
+    [+-]digits[.digits][e[+-]digits]. Only inputs that convert exactly
+    (<= 15 significant digits, |10-exponent| <= 22) are accepted; ok[i] = False marks
+    rows left for the pandas parser (words like "nan"/"inf", long mantissas, bad syntax).
+    """
+    n, w = buf.shape
+    for i in range(n):
+        out[i] = np.nan
+        ok[i] = False
+
+        mant = 0
+        ndig = 0        # significant mantissa digits
+        nmant = 0       # all mantissa digits (incl. leading zeros)
+        frac = 0        # digits after the decimal point
+        neg = False
+        exp = 0
+        exp_neg = False
+        exp_signed = False  # at most one sign after 'e'
+        nexp = 0
+        state = 0       # 0 start, 1 after sign, 2 int, 3 frac, 4 exp sign, 5 exp digits
+        started = False
+        bad = False
+
+        for j in range(w):
+            c = int(buf[i, j])
+            if c == 0:
+                break
+            if c == 37 or c == 44 or c == 32 or (c >= 9 and c <= 13):  # '%' ',' whitespace
+                continue
+            started = True
+
+            if c >= 48 and c <= 57:
+                d = c - 48
+                if state <= 3:
+                    if state <= 1:
+                        state = 2
+                    nmant += 1
+                    if mant > 0 or d > 0:
+                        ndig += 1
+                        if ndig > 15:
+                            bad = True
+                            break
+                    mant = mant * 10 + d
+                    if state == 3:
+                        frac += 1
+                else:
+                    state = 5
+                    nexp += 1
+                    exp = exp * 10 + d
+                    if exp > 400:
+                        bad = True
+                        break
+            elif c == 46 and state <= 2:  # '.'
+                state = 3
+            elif (c == 43 or c == 45) and state == 0:  # leading sign
+                neg = c == 45
+                state = 1
+            elif (c == 101 or c == 69) and (state == 2 or state == 3) and nmant > 0:  # 'e' / 'E'
+                state = 4
+            elif (c == 43 or c == 45) and state == 4 and nexp == 0 and not exp_signed:
+                exp_neg = c == 45
+                exp_signed = True
+            else:
+                bad = True
+                break
+
+        if bad:
+            continue
+        if not started:
+            ok[i] = True  # blank -> NaN
+            continue
+        if nmant == 0 or state == 4:
+            continue
+
+        scale = (-exp if exp_neg else exp) - frac
+        v = float(mant)
+        if mant != 0:
+            if scale > 22 or scale < -22:
+                continue
+            if scale > 0:
+                v = v * _POW10[scale]
+            elif scale < 0:
+                v = v / _POW10[-scale]
+        out[i] = -v if neg else v
+        ok[i] = True
+
+
+def _vec_to_float_njit(s: pd.Series) -> Optional[pd.Series]:
+    """
+    Compiled fast path for _vec_to_float. Returns None if the text is not pure ASCII.
+    Rows the kernel cannot convert exactly are re-parsed by the pandas path.
+    """
     try:
-        # allow strings like "5.25%" or "5,25"
-        s = str(x).strip().replace("%", "").replace(",", "")
-        if s == "":
-            return None
-        return float(s)
-    except Exception:
+        raw = np.asarray(s.fillna("").astype(str).to_numpy(), dtype="S")
+    except UnicodeEncodeError:
         return None
 
+    buf = raw.view(np.uint8).reshape(len(raw), raw.dtype.itemsize)
+    out = np.empty(len(raw), dtype=np.float64)
+    ok = np.empty(len(raw), dtype=np.bool_)
+    _parse_float_bytes(buf, out, ok)
+
+    res = pd.Series(out, index=s.index, name=s.name)
+    if not ok.all():
+        res[~ok] = _vec_to_float_pandas(s[~ok])
+    return res
+
+
+def _vec_to_float(s: pd.Series) -> pd.Series:
+    """
+    Vectorized numeric parse for manual macro columns.
+    Accepts strings like "5.25%" or "1,250"; anything unparseable becomes NaN.
+    Large columns go through the numba kernel when numba is installed.
+    """
+    if HAVE_NUMBA and len(s) > _NJIT_MIN_ROWS:
+        res = _vec_to_float_njit(s)
+        if res is not None:
+            return res
+    return _vec_to_float_pandas(s)
+
+
+def _vec_to_float_pandas(s: pd.Series) -> pd.Series:
+    cleaned = s.astype(str).str.replace(_FLOAT_CLEAN_RE, "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce").astype(float)
+
+
+# Version of the normalized schema in the Parquet cache file name. Bump it whenever the
+# loader's output changes (columns, dtypes, label handling) so older caches are ignored.
+_CACHE_SCHEMA_VERSION = 1
 
-def load_country_universe(path: str, sheet_name: Optional[str] = None) -> pd.DataFrame:
-    df = pd.read_excel(path, sheet_name=sheet_name)
 
-    # ---- FIX: handle multiple sheets safely ----
-    if isinstance(df, dict):
-        # take the first sheet deterministically
-        df = next(iter(df.values()))
+def _cache_path(path: Path, sheet_name: Optional[str]) -> Path:
+    tag = f"v{_CACHE_SCHEMA_VERSION}"
+    if sheet_name is None:
+        return path.with_name(f"{path.stem}.{tag}.parquet")
+    return path.with_name(f"{path.stem}.{sheet_name}.{tag}.parquet")
 
+
+def load_country_universe(
+    path: str,
+    sheet_name: Optional[str] = None,
+    use_cache: bool = True,
+) -> pd.DataFrame:
     """
     Read the Excel universe file and return a normalized DataFrame.
 
@@ -64,76 +242,102 @@ def load_country_universe(path: str, sheet_name: Optional[str] = None) -> pd.Dat
       - ETF
 
     Optional columns (if present) are carried through and parsed into numeric where appropriate.
+    Any other columns in the sheet are not read.
+
+    With use_cache=True the result is memoized in-process per (path, sheet, workbook mtime),
+    and the normalized frame is stored as Parquet next to the .xlsx (tagged with the loader's
+    schema version) and reused while it is at least as new as the workbook (requires pyarrow;
+    skipped otherwise). Each call returns its own copy. use_cache=False always re-reads the
+    Excel file.
     """
-    df = pd.read_excel(path, sheet_name=sheet_name)
+    if not use_cache:
+        return _load_country_universe_impl(path, sheet_name)
+
+    mtime = Path(path).stat().st_mtime
+    # Copy so callers can mutate without poisoning the memo
+    return _load_cached(str(path), sheet_name, mtime).copy()
+
+
+@lru_cache(maxsize=4)
+def _load_cached(path: str, sheet_name: Optional[str], mtime: float) -> pd.DataFrame:
+    # mtime is only part of the key: an edited workbook gets a fresh entry
+    src = Path(path)
+    cache = _cache_path(src, sheet_name)
+
+    if cache.exists() and cache.stat().st_mtime >= mtime:
+        try:
+            return pd.read_parquet(cache, engine="pyarrow")
+        except (ImportError, OSError, ValueError):
+            pass  # no pyarrow / unreadable cache -> rebuild from Excel
+
+    df = _load_country_universe_impl(path, sheet_name)
+
+    try:
+        df.to_parquet(cache, index=False, engine="pyarrow")
+    except (ImportError, OSError, ValueError):
+        pass
+
+    return df
+
+
+def _load_country_universe_impl(path: str, sheet_name: Optional[str]) -> pd.DataFrame:
+    known = REQUIRED_COLS | set(OPTIONAL_COLS)
+
+    # pandas' openpyxl reader already opens the workbook read_only + data_only (streaming,
+    # cached formula values); passing those again via engine_kwargs breaks pandas < 2.2
+    df = pd.read_excel(
+        path,
+        sheet_name=0 if sheet_name is None else sheet_name,  # default: first sheet
+        engine="openpyxl",
+        usecols=lambda c: str(c).strip() in known,  # skip parsing unknown columns
+        dtype=str,  # raw text; numeric columns are parsed below via _vec_to_float
+    )
 
     # Normalize column names (strip whitespace)
     df.columns = [str(c).strip() for c in df.columns]
+    cols_set = frozenset(df.columns)
 
-    missing = REQUIRED_COLS - set(df.columns)
+    missing = REQUIRED_COLS - cols_set
     if missing:
         raise ValueError(
             f"Universe is missing required columns: {sorted(missing)}.\n"
             f"Found columns: {list(df.columns)}"
         )
 
-    # Keep only known columns + any extras (extras are preserved but not relied upon)
-    # First, ensure required columns are present
-    df = df.copy()
-
     # Normalize Country / ETF
-    df["Country"] = df["Country"].apply(_clean_str)
-    df["ETF"] = df["ETF"].apply(_clean_str).str.upper()
+    df["Country"] = df["Country"].fillna("").astype(str).str.strip()
+    df["ETF"] = df["ETF"].fillna("").astype(str).str.strip().str.upper()
 
-    # Drop empty rows
-    df = df[(df["Country"] != "") & (df["ETF"] != "")].copy()
+    # Drop empty rows (one NumPy mask, one slice)
+    mask = (df["Country"].to_numpy() != "") & (df["ETF"].to_numpy() != "")
+    df = df.loc[mask].reset_index(drop=True)
 
-    # Parse numeric optional fields if present
-    for col in ["PolicyRate", "PolicyRate_3M_Ago", "CPI_YoY", "CurrentAccount_GDP", "RiskFlag"]:
-        if col in df.columns:
-            df[col] = df[col].apply(_to_float)
+    # De-duplicate by Country, case/whitespace-insensitive (keep first), before any parsing
+    key = df["Country"].str.casefold()
+    df = df.loc[~key.duplicated(keep="first")].reset_index(drop=True)
+
+    # Parse numeric optional fields if present (nullable Float64: contiguous values + NA mask)
+    for col in _NUMERIC_OPT_COLS & cols_set:
+        df[col] = _vec_to_float(df[col]).astype("Float64")
+
+    # RiskFlag is 0/1/2 -> Int8 when every value is a whole number in range
+    if "RiskFlag" in cols_set:
+        rf = df["RiskFlag"]
+        valid = rf.dropna()
+        if ((valid % 1 == 0) & valid.between(-128, 127)).all():
+            df["RiskFlag"] = rf.astype("Int8")
 
     # Parse GrowthMomentum if present (accept numeric or strings)
-    if "GrowthMomentum" in df.columns:
-        def _gm(x):
-            if pd.isna(x):
-                return None
-            s = str(x).strip()
-            if s == "":
-                return None
-            # allow "accelerating/flat/decelerating"
-            low = s.lower()
-            if low in ("accelerating", "up", "positive", "+1", "1"):
-                return 1.0
-            if low in ("decelerating", "down", "negative", "-1"):
-                return -1.0
-            if low in ("flat", "0", "neutral"):
-                return 0.0
-            try:
-                v = float(s)
-                # clamp to [-1, 1]
-                return max(-1.0, min(1.0, v))
-            except Exception:
-                return None
-
-        df["GrowthMomentum"] = df["GrowthMomentum"].apply(_gm)
-
-    # Normalize FX_Regime if present
-    if "FX_Regime" in df.columns:
-        def _fxr(x):
-            s = _clean_str(x).lower()
-            if s in ("pegged", "peg"):
-                return "Pegged"
-            if s in ("managed", "crawl", "band"):
-                return "Managed"
-            if s in ("freefloat", "free", "float", "floating"):
-                return "FreeFloat"
-            return _clean_str(x) if _clean_str(x) else None
-
-        df["FX_Regime"] = df["FX_Regime"].apply(_fxr)
-
-    # De-duplicate by Country (keep first)
-    df = df.drop_duplicates(subset=["Country"], keep="first").reset_index(drop=True)
+    if "GrowthMomentum" in cols_set:
+        gm = df["GrowthMomentum"].astype(str).str.strip().str.lower()
+        # numeric fallback, clamped to [-1, 1]
+        numeric = pd.to_numeric(gm, errors="coerce").clip(-1.0, 1.0)
+        df["GrowthMomentum"] = gm.map(_GM_MAP).fillna(numeric).astype("Float64")
+
+    # Normalize FX_Regime if present (unknown labels and blanks -> missing)
+    if "FX_Regime" in cols_set:
+        canonical = df["FX_Regime"].fillna("").astype(str).str.strip().str.lower().map(_FXR_MAP)
+        df["FX_Regime"] = pd.Categorical(canonical, categories=FX_REGIMES)
 
     # Final sanity checks
     if df.empty: